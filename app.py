@@ -1,6 +1,15 @@
 import os
+import asyncio
 import re
 import json
+import hashlib
+import functools
+import threading
+import copy
+from cachetools import TTLCache
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+import fastjsonschema
 import streamlit as st
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
 
@@ -9,25 +18,92 @@ try:
 except Exception:
     openai = None
 
+# which SDK generation is installed never changes while the app runs
+_USE_NEW_CLIENT = openai is not None and hasattr(openai, "OpenAI")
+
+# orjson parses large model responses several times faster; fall back to the stdlib when it is missing
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+
+# one transcript client per thread: each owns a requests.Session, which is not safe to share
+# between the concurrent fetches of get_transcript_text_batch
+_transcript_api_local = threading.local()
+
+
+def _transcript_api() -> YouTubeTranscriptApi:
+    api = getattr(_transcript_api_local, "api", None)
+    if api is None:
+        api = _transcript_api_local.api = YouTubeTranscriptApi()
+    return api
+
+
+# Common patterns: youtu.be/<id>, youtube.com/watch?v=<id>, youtube.com/shorts/<id>, youtube.com/embed/<id>
+# (single alternation so the url is scanned once; bare ids are handled before the regex)
+_YT_ID_RE = re.compile(
+    r"youtu\.be/([\w-]{11})"
+    r"|[?&]v=([\w-]{11})"
+    r"|/shorts/([\w-]{11})"
+    r"|/embed/([\w-]{11})"
+)
+# transcripts longer than this are summarized in parts before generating notes
+LONG_TRANSCRIPT_CHARS = 15000
+# models that reject response_format={"type": "json_object"} (JSON mode needs gpt-3.5-turbo-1106 / gpt-4-turbo or newer)
+_NO_JSON_MODE_MODELS = {"gpt-4", "gpt-4-0314", "gpt-4-0613", "gpt-4-32k", "gpt-3.5-turbo-0301", "gpt-3.5-turbo-0613", "gpt-3.5-turbo-16k"}
+
+# prompts never change, so they are built once at import
+_SYSTEM_MSG = (
+    "You are an assistant that converts a video transcript into a learning package. "
+    "Return ONLY valid JSON with keys: summary (string), key_points (list of short strings), quiz (list of EXACTLY 10 strings). "
+    "Do not include any extra commentary outside the JSON. Keep summary short (2-4 sentences)."
+)
+_NOTES_INSTRUCTIONS = (
+    "From this transcript:\n"
+    "1) Create a short summary (2-4 sentences).\n"
+    "2) Give important key points as a bulleted list (concise).\n"
+    "3) Generate exactly 10 quiz questions (clear, varied difficulty).\n"
+    "Return the result as JSON exactly like: {\n  \"summary\": \"...\",\n  \"key_points\": [\"...\", ...],\n  \"quiz\": [\"Q1\", \"Q2\", ...]\n}\n"
+)
+_CHUNK_SYSTEM_MSG = (
+    "You are an assistant that takes notes on one part of a longer video transcript. "
+    "Reply with concise plain-text notes covering every important point in this part."
+)
+
+# shape every notes result must have; compiled once into a plain Python validator function
+_NOTES_SCHEMA = {
+    "type": "object",
+    "required": ["summary", "key_points", "quiz"],
+    "properties": {
+        "summary": {"type": "string"},
+        "key_points": {"type": "array", "items": {"type": "string"}},
+        "quiz": {"type": "array", "minItems": 10, "maxItems": 10, "items": {"type": "string"}},
+    },
+}
+_validate_notes = fastjsonschema.compile(_NOTES_SCHEMA)
+
+# first { ... } block in a model response, only needed for models without JSON mode
+_JSON_BLOCK_RE = re.compile(r"\{.*\}", re.DOTALL)
+
 
 def extract_video_id(url: str) -> str:
     """Extract YouTube video ID from a URL or return the input if it already looks like an id."""
     if not url:
         return ""
-    # Common patterns: youtu.be/<id>, youtube.com/watch?v=<id>, youtube.com/shorts/<id>
-    patterns = [
-        r"youtu\.be/([\w-]{11})",
-        r"v=([\w-]{11})",
-        r"/shorts/([\w-]{11})",
-        r"/embed/([\w-]{11})",
-        r"^([\w-]{11})$",
-    ]
-    for p in patterns:
-        m = re.search(p, url)
-        if m:
-            return m.group(1)
+    s = url.strip()
+    # fast path: a bare id (the usual programmatic input) needs no regex
+    if len(s) == 11 and s.replace("-", "").replace("_", "").isalnum():
+        return s
+    # anything else must at least be a youtube / youtu.be link
+    if "youtu" not in s:
+        return ""
+    m = _YT_ID_RE.search(s)
+    if m:
+        return next((g for g in m.groups() if g), "")
     # fallback: try to parse last path segment
-    parts = url.rstrip("/\n ").split("/")
+    parts = s.rstrip("/").split("/")
     if parts:
         candidate = parts[-1]
         if len(candidate) == 11:
@@ -35,6 +111,7 @@ def extract_video_id(url: str) -> str:
     return ""
 
 
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
 def get_transcript_text(video_id: str) -> str:
     """Fetch transcript text for the given video id using youtube-transcript-api."""
     if not video_id:
@@ -42,11 +119,10 @@ def get_transcript_text(video_id: str) -> str:
     try:
         # newer versions of youtube-transcript-api expose an API class with instance methods
         # use the instance .fetch(...) which returns a FetchedTranscript
-        fetched = YouTubeTranscriptApi().fetch(video_id)
+        fetched = _transcript_api().fetch(video_id)
         # convert to raw data (list of dicts with 'text')
         raw = fetched.to_raw_data()
-        texts = [e.get("text", "") for e in raw]
-        return "\n".join(texts)
+        return "\n".join(e["text"] for e in raw if e.get("text"))
     except TranscriptsDisabled:
         raise RuntimeError("Transcripts are disabled for this video.")
     except NoTranscriptFound:
@@ -57,57 +133,76 @@ def get_transcript_text(video_id: str) -> str:
         raise RuntimeError(f"Failed to fetch transcript: {e}")
 
 
-def call_openai_for_notes(transcript: str, api_key: str | None = None) -> dict:
-    """Send transcript to OpenAI (ChatCompletion) and request JSON result with summary, key_points, quiz (10 questions).
-    If `api_key` is provided it will be used, otherwise the function reads OPENAI_API_KEY from the environment.
+def get_transcript_text_batch(video_ids: list[str]) -> list:
+    """Fetch transcripts for several video ids concurrently.
+    Returns one entry per id, in order: the transcript text, or the exception raised while fetching it.
     """
-    # prefer explicit api_key (from UI) for ease of local testing
-    key = api_key or os.getenv("OPENAI_API_KEY")
-    if not key:
-        raise RuntimeError("OPENAI_API_KEY environment variable not set. Set it to your OpenAI API key or provide it in the UI.")
-    if openai is None:
-        raise RuntimeError("openai python package not installed.")
+    async def _fetch_many():
+        return await asyncio.gather(
+            *(asyncio.to_thread(get_transcript_text, vid) for vid in video_ids),
+            return_exceptions=True,
+        )
+
+    return asyncio.run(_fetch_many())
 
-    openai.api_key = key
 
-    system_msg = (
-        "You are an assistant that converts a video transcript into a learning package. "
-        "Return ONLY valid JSON with keys: summary (string), key_points (list of short strings), quiz (list of EXACTLY 10 strings). "
-        "Do not include any extra commentary outside the JSON. Keep summary short (2-4 sentences)."
-    )
+@functools.lru_cache(maxsize=4)
+def _get_client(key: str):
+    """Return one OpenAI client per API key so its connection pool (and TLS sessions) is reused across calls."""
+    try:
+        return openai.OpenAI(api_key=key)
+    except TypeError:
+        # some versions expect API key from env / openai.api_key
+        openai.api_key = key
+        return openai.OpenAI()
 
-    user_msg = (
-        "Here is the transcript:\n\n" + transcript + "\n\n" +
-        "From this transcript:\n" +
-        "1) Create a short summary (2-4 sentences).\n" +
-        "2) Give important key points as a bulleted list (concise).\n" +
-        "3) Generate exactly 10 quiz questions (clear, varied difficulty).\n" +
-        "Return the result as JSON exactly like: {\n  \"summary\": \"...\",\n  \"key_points\": [\"...\", ...],\n  \"quiz\": [\"Q1\", \"Q2\", ...]\n}\n"
-    )
 
+def _chunk(transcript: str, max_chars: int = 8000, overlap: int = 400) -> list[str]:
+    """Split a transcript into pieces of at most `max_chars`, cutting at line breaks where possible.
+    Consecutive pieces share `overlap` characters so no sentence is lost at a boundary.
+    """
+    chunks = []
+    start = 0
+    while start < len(transcript):
+        end = min(start + max_chars, len(transcript))
+        if end < len(transcript):
+            cut = transcript.rfind("\n", start + overlap + 1, end)
+            if cut != -1:
+                end = cut
+        chunks.append(transcript[start:end])
+        if end >= len(transcript):
+            break
+        start = end - overlap
+    return chunks
+
+
+def _chat(key: str, model_name: str, system_msg: str, user_msg: str, on_delta: Callable[[str], None] | None = None,
+          max_tokens: int = 1200, json_mode: bool = False) -> str:
+    """Run one chat completion and return the reply text.
+    With `on_delta` the reply is streamed and `on_delta` receives the accumulated text after every chunk.
+    With `json_mode=True` the API is asked to return a single valid JSON object.
+    """
+    # response_format is passed straight through to the API by both SDK generations
+    extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+    stream = on_delta is not None
     try:
         # Support both pre-1.0 `openai` usage and the newer 1.0+ client
-        model_name = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-        if hasattr(openai, "OpenAI"):
+        if _USE_NEW_CLIENT:
             # Newer OpenAI client (openai>=1.0.0)
-            try:
-                client = openai.OpenAI(api_key=key)
-            except TypeError:
-                # some versions expect API key from env / openai.api_key
-                openai.api_key = key
-                client = openai.OpenAI()
-
-            response = client.chat.completions.create(
+            response = _get_client(key).chat.completions.create(
                 model=model_name,
                 messages=[
                     {"role": "system", "content": system_msg},
                     {"role": "user", "content": user_msg},
                 ],
                 temperature=0.2,
-                max_tokens=1200,
+                max_tokens=max_tokens,
+                stream=stream,
+                **extra,
             )
         else:
             # Older interface
+            openai.api_key = key
             response = openai.ChatCompletion.create(
                 model=model_name,
                 messages=[
@@ -115,44 +210,124 @@ def call_openai_for_notes(transcript: str, api_key: str | None = None) -> dict:
                     {"role": "user", "content": user_msg},
                 ],
                 temperature=0.2,
-                max_tokens=1200,
+                max_tokens=max_tokens,
+                stream=stream,
+                **extra,
             )
     except Exception as e:
         raise RuntimeError(f"OpenAI API call failed: {e}")
 
-    # Extract text from response in a resilient way
+    # The response shape follows the SDK generation, which is known at import time
     def _extract_text(resp):
-        # try attribute access first
+        if _USE_NEW_CLIENT:
+            return resp.choices[0].message.content or ""
+        return resp["choices"][0]["message"]["content"]
+
+    def _extract_delta(chunk):
+        if _USE_NEW_CLIENT:
+            # the closing chunk of a stream may carry no choices
+            return (chunk.choices[0].delta.content or "") if chunk.choices else ""
+        return chunk["choices"][0]["delta"].get("content", "")
+
+    if stream:
+        # hand out the output as it is generated instead of waiting for the whole completion
+        buffer = ""
         try:
-            return resp.choices[0].message.content
-        except Exception:
-            pass
+            for chunk in response:
+                buffer += _extract_delta(chunk)
+                on_delta(buffer)
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API call failed: {e}")
+        return buffer.strip()
+    return _extract_text(response).strip()
+
+
+def _request_notes(transcript: str, key: str, model_name: str, on_delta: Callable[[str], None] | None = None) -> dict:
+    """Build the prompt, call the chat completion endpoint and parse its JSON answer.
+    Transcripts longer than LONG_TRANSCRIPT_CHARS are summarized chunk by chunk in parallel first,
+    and the final call works from those partial notes.
+    """
+    source = "Here is the transcript:"
+    if len(transcript) > LONG_TRANSCRIPT_CHARS:
+        chunks = _chunk(transcript)
+        with ThreadPoolExecutor(max_workers=min(8, len(chunks))) as pool:
+            partials = list(pool.map(
+                lambda c: _chat(key, model_name, _CHUNK_SYSTEM_MSG, f"Transcript part:\n\n{c}", max_tokens=600),
+                chunks,
+            ))
+        transcript = "\n\n".join(f"Part {i}:\n{p}" for i, p in enumerate(partials, start=1))
+        source = "Here are notes on consecutive parts of a long transcript:"
+
+    # built in one go rather than by chained + on a potentially very long transcript
+    user_msg = f"{source}\n\n{transcript}\n\n{_NOTES_INSTRUCTIONS}"
+
+    json_mode = model_name not in _NO_JSON_MODE_MODELS
+    text = _chat(key, model_name, _SYSTEM_MSG, user_msg, on_delta=on_delta, json_mode=json_mode)
+
+    if json_mode:
+        # JSON mode guarantees a well-formed object, no need to search for one
         try:
-            return resp["choices"][0]["message"]["content"]
+            result = json_loads(text)
         except Exception:
-            pass
+            raise RuntimeError("OpenAI returned invalid JSON (the output may have been cut off).\nOutput:\n" + text)
+    else:
+        # Try direct JSON parse, otherwise try to extract JSON substring
         try:
-            return resp.choices[0].text
+            result = json_loads(text)
         except Exception:
-            pass
-        # fallback to string
-        return str(resp)
+            # attempt to find first { ... } block
+            m = _JSON_BLOCK_RE.search(text)
+            if m:
+                try:
+                    result = json_loads(m.group(0))
+                except Exception:
+                    raise RuntimeError("OpenAI returned non-JSON output and automatic parsing failed.\nOutput:\n" + text)
+            else:
+                raise RuntimeError("OpenAI returned non-JSON output and no JSON object found.\nOutput:\n" + text)
 
-    text = _extract_text(response).strip()
-
-    # Try direct JSON parse, otherwise try to extract JSON substring
     try:
-        return json.loads(text)
-    except Exception:
-        # attempt to find first { ... } block
-        m = re.search(r"\{.*\}", text, re.DOTALL)
-        if m:
-            try:
-                return json.loads(m.group(0))
-            except Exception:
-                raise RuntimeError("OpenAI returned non-JSON output and automatic parsing failed.\nOutput:\n" + text)
-        else:
-            raise RuntimeError("OpenAI returned non-JSON output and no JSON object found.\nOutput:\n" + text)
+        _validate_notes(result)
+    except fastjsonschema.JsonSchemaValueException as e:
+        raise RuntimeError(f"OpenAI returned notes in an unexpected format: {e.message}.\nOutput:\n" + text)
+    return result
+
+
+@st.cache_resource
+def _notes_cache() -> tuple[TTLCache, threading.Lock]:
+    """One notes cache (and the lock guarding it) per process; st.cache_resource keeps it alive across reruns.
+    Plain st.cache_data is not used because notes are produced while streaming into the page,
+    and it would record and replay every one of those updates.
+    """
+    return TTLCache(maxsize=512, ttl=3600), threading.Lock()
+
+
+def call_openai_for_notes(transcript: str, api_key: str | None = None, model: str = "gpt-3.5-turbo",
+                          on_delta: Callable[[str], None] | None = None) -> dict:
+    """Send transcript to OpenAI (ChatCompletion) and request JSON result with summary, key_points, quiz (10 questions).
+    If `api_key` is provided it will be used, otherwise the function reads OPENAI_API_KEY from the environment.
+    `model` is the chat model to use.
+    If `on_delta` is given the completion is streamed and it is called with the reply text received so far
+    after every chunk (it is not called when the result comes from the cache).
+    Results are cached per transcript content and model, so reruns on the same video skip the API call.
+    """
+    # prefer explicit api_key (from UI) for ease of local testing
+    key = api_key or os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise RuntimeError("OPENAI_API_KEY environment variable not set. Set it to your OpenAI API key or provide it in the UI.")
+    if openai is None:
+        raise RuntimeError("openai python package not installed.")
+
+    # key the cache on the transcript content so the same transcript reached via different urls is reused
+    cache_key = (hashlib.blake2b(transcript.encode(), digest_size=16).hexdigest(), model)
+    cache, lock = _notes_cache()
+    with lock:
+        result = cache.get(cache_key)
+    if result is None:
+        # only a miss talks to the API (and streams); the cache itself holds nothing but the final dict
+        result = _request_notes(transcript, key, model, on_delta)
+        with lock:
+            cache[cache_key] = result
+    return copy.deepcopy(result)
 
 
 # Streamlit UI
@@ -163,6 +338,7 @@ st.write("Paste a YouTube link and get a short summary, key points, and exactly
 col1, col2 = st.columns([3, 1])
 with col1:
     url = st.text_input("YouTube link (or video id)")
+    extra_urls = st.text_area("More YouTube links (optional, one per line)", height=100)
 with col2:
     model_choice = st.selectbox("OpenAI model", options=["gpt-3.5-turbo", "gpt-4"], index=0)
     # optional API key input for quick local testing (keeps key out of logs/UI unless entered)
@@ -179,18 +355,28 @@ with col2:
         st.warning("No OpenAI API key found. Paste one above or set OPENAI_API_KEY in the shell before starting the app.")
 
 if st.button("Process"):
-    if not url:
+    urls = [u for u in [url, *extra_urls.splitlines()] if u.strip()]
+    if not urls:
         st.error("Please paste a YouTube URL or video id.")
     else:
-        with st.spinner("Extracting video id..."):
-            vid = extract_video_id(url)
-        if not vid:
-            st.error("Could not extract a YouTube video id from the URL. Please check the link.")
-        else:
+        video_ids = []
+        for u in urls:
+            vid = extract_video_id(u)
+            if vid:
+                video_ids.append(vid)
+            else:
+                st.error(f"Could not extract a YouTube video id from {u!r}. Please check the link.")
+        if not video_ids:
+            st.stop()
+        # the same video pasted twice is fetched and shown once
+        video_ids = list(dict.fromkeys(video_ids))
+        with st.spinner("Fetching transcript..." if len(video_ids) == 1 else f"Fetching {len(video_ids)} transcripts..."):
+            transcripts = get_transcript_text_batch(video_ids)
+        for vid, transcript_text in zip(video_ids, transcripts):
             st.info(f"Video id: {vid}")
             try:
-                with st.spinner("Fetching transcript..."):
-                    transcript_text = get_transcript_text(vid)
+                if isinstance(transcript_text, Exception):
+                    raise transcript_text
                 if not transcript_text.strip():
                     st.error("Transcript is empty.")
                 else:
@@ -198,44 +384,41 @@ if st.button("Process"):
                     st.success("Transcript fetched.")
                     st.write(f"Transcript length: {len(transcript_text)} characters")
                     # confirm large transcripts
-                    if len(transcript_text) > 15000:
-                        st.warning("Transcript is large; API calls may be truncated. Consider using a shorter video or summarizing in parts.")
+                    if len(transcript_text) > LONG_TRANSCRIPT_CHARS:
+                        st.info("Transcript is large; it will be summarized in parts before generating notes.")
 
                     # call OpenAI
                     try:
-                        os.environ["OPENAI_MODEL"] = model_choice
                         # prefer UI-provided API key if present
                         ui_api_key = st.session_state.get("ui_openai_key", None)
-                        with st.spinner("Sending transcript to the AI and generating notes..."):
-                            result = call_openai_for_notes(transcript_text, api_key=ui_api_key)
-
-                        # Validate result keys
-                        summary = result.get("summary", "")
-                        key_points = result.get("key_points", [])
-                        quiz = result.get("quiz", [])
+                        # show the reply as it streams in; cleared once the full result is available
+                        preview = st.empty()
+                        try:
+                            with st.spinner("Sending transcript to the AI and generating notes..."):
+                                result = call_openai_for_notes(
+                                    transcript_text,
+                                    api_key=ui_api_key,
+                                    model=model_choice,
+                                    on_delta=lambda text: preview.code(text, language="json"),
+                                )
+                        finally:
+                            preview.empty()
 
+                        # result has already been validated against _NOTES_SCHEMA
                         st.markdown("---")
                         st.subheader("Summary")
-                        st.write(summary)
+                        st.write(result["summary"])
 
                         st.subheader("Key Points")
-                        if isinstance(key_points, list) and key_points:
-                            for kp in key_points:
+                        if result["key_points"]:
+                            for kp in result["key_points"]:
                                 st.write(f"• {kp}")
                         else:
                             st.write("(No key points returned)")
 
                         st.subheader("Quiz — 10 Questions")
-                        if isinstance(quiz, list) and len(quiz) == 10:
-                            for i, q in enumerate(quiz, start=1):
-                                st.write(f"{i}. {q}")
-                        else:
-                            st.warning("Quiz did not contain exactly 10 questions; showing what was returned.")
-                            if isinstance(quiz, list):
-                                for i, q in enumerate(quiz, start=1):
-                                    st.write(f"{i}. {q}")
-                            else:
-                                st.write(quiz)
+                        for i, q in enumerate(result["quiz"], start=1):
+                            st.write(f"{i}. {q}")
 
                     except Exception as e:
                         st.error(f"Failed to generate notes: {e}")
@@ -1,7 +1,7 @@
 const axios = require('axios');
 const { YoutubeTranscript } = require('youtube-transcript');
 const Video = require('../models/Video');
-const { exec } = require('child_process');
+const { exec, spawn } = require('child_process');
 const path = require('path');
 const fs = require('fs');
 
@@ -41,6 +41,81 @@ function extractVideoId(url) {
   return null;
 }
 
+/**
+ * Long-lived Whisper worker (scripts/transcribe_audio.py without arguments).
+ * The model is loaded once and each request is one audio path written to its stdin,
+ * answered by one JSON line on stdout, in order.
+ * Requests are therefore transcribed one at a time, not in parallel processes: a request
+ * waits for the ones queued before it. Each request gets WHISPER_TIMEOUT_MS once it reaches
+ * the front of the queue; past that the worker is killed, everything queued is rejected and
+ * the next request starts a fresh worker.
+ */
+const WHISPER_TIMEOUT_MS = Number(process.env.WHISPER_TIMEOUT_MS) || 10 * 60 * 1000;
+let whisperWorker = null;
+
+function startWhisperTimer(worker) {
+  const head = worker.pending[0];
+  if (!head || head.timer) return;
+  head.timer = setTimeout(() => {
+    console.error(`Whisper transcription timed out after ${WHISPER_TIMEOUT_MS} ms, restarting worker`);
+    worker.fail(new Error('Whisper transcription timed out'));
+    worker.proc.kill('SIGKILL');
+  }, WHISPER_TIMEOUT_MS);
+}
+
+function getWhisperWorker() {
+  if (whisperWorker) return whisperWorker;
+
+  const pythonPath = path.join(__dirname, '../venv/bin/python');
+  const scriptPath = path.join(__dirname, '../scripts/transcribe_audio.py');
+  const proc = spawn(pythonPath, [scriptPath], { stdio: ['pipe', 'pipe', 'inherit'] });
+  const worker = { proc, pending: [], buffer: '' };
+
+  proc.stdout.setEncoding('utf8');
+  proc.stdout.on('data', (chunk) => {
+    worker.buffer += chunk;
+    let newline;
+    while ((newline = worker.buffer.indexOf('\n')) !== -1) {
+      const line = worker.buffer.slice(0, newline);
+      worker.buffer = worker.buffer.slice(newline + 1);
+      const request = worker.pending.shift();
+      if (!request) continue;
+      clearTimeout(request.timer);
+      startWhisperTimer(worker);
+      try {
+        request.resolve(JSON.parse(line));
+      } catch (parseError) {
+        console.error('Failed to parse transcript:', line.substring(0, 200) + '...');
+        request.reject(parseError);
+      }
+    }
+  });
+
+  const fail = (err) => {
+    if (whisperWorker === worker) whisperWorker = null;
+    worker.pending.splice(0).forEach((request) => {
+      clearTimeout(request.timer);
+      request.reject(err);
+    });
+  };
+  worker.fail = fail;
+  proc.on('error', fail);
+  proc.stdin.on('error', fail);
+  proc.on('exit', (code, signal) => fail(new Error(`Whisper worker exited with ${signal || `code ${code}`}`)));
+
+  whisperWorker = worker;
+  return worker;
+}
+
+function runWhisper(audioFile) {
+  return new Promise((resolve, reject) => {
+    const worker = getWhisperWorker();
+    worker.pending.push({ resolve, reject, timer: null });
+    startWhisperTimer(worker);
+    worker.proc.stdin.write(`${audioFile}\n`);
+  });
+}
+
 /**
  * Helper to download audio and transcribe using local Whisper
  */
@@ -88,32 +163,22 @@ async function transcribeAudio(videoId) {
       return reject(err);
     }
 
-    // 2. Transcribe using Python script
-    const pythonPath = path.join(__dirname, '../venv/bin/python');
-    const scriptPath = path.join(__dirname, '../scripts/transcribe_audio.py');
-    
+    // 2. Transcribe using the persistent Whisper worker
     console.log('Running Whisper transcription...');
-    exec(`"${pythonPath}" "${scriptPath}" "${expectedAudioFile}"`, { maxBuffer: 1024 * 1024 * 10 }, (error, stdout, stderr) => {
+    try {
+      const segments = await runWhisper(expectedAudioFile);
+      if (segments.error) return reject(new Error(segments.error));
+
+      const fullText = segments.map(s => s.text).join(' ');
+      console.log(`✅ Transcription complete: ${fullText.length} characters`);
+      resolve(fullText);
+    } catch (err) {
+      console.error('Whisper transcription failed:', err.message);
+      reject(err);
+    } finally {
       // Clean up audio file
       if (fs.existsSync(expectedAudioFile)) fs.unlinkSync(expectedAudioFile);
-      
-      if (error) {
-        console.error('Whisper script failed:', stderr);
-        return reject(error);
-      }
-      
-      try {
-        const segments = JSON.parse(stdout);
-        if (segments.error) return reject(new Error(segments.error));
-        
-        const fullText = segments.map(s => s.text).join(' ');
-        console.log(`✅ Transcription complete: ${fullText.length} characters`);
-        resolve(fullText);
-      } catch (parseError) {
-        console.error('Failed to parse transcript:', stdout.substring(0, 200) + '...');
-        reject(parseError);
-      }
-    });
+    }
   });
 }
 
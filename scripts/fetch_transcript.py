@@ -1,44 +1,61 @@
 import sys
-import json
+import asyncio
+import threading
 from youtube_transcript_api import YouTubeTranscriptApi
+from json_output import write_json_line
+
+# Resolve the fetch method name once: instance .fetch (>=1.0) or the older get_transcript
+_FETCH_NAME = next((name for name in ('fetch', 'get_transcript') if hasattr(YouTubeTranscriptApi, name)), None)
+
+# One API instance per thread for get_transcripts (same reasoning as _transcript_api in app.py)
+_local = threading.local()
+
+def _api():
+    api = getattr(_local, 'api', None)
+    if api is None:
+        api = _local.api = YouTubeTranscriptApi()
+    return api
+
+def _item_text(item):
+    # Entries are dicts in older versions of the library and snippet objects in newer ones
+    if isinstance(item, dict):
+        return item.get('text', '')
+    if hasattr(item, 'text'):
+        return item.text
+    return str(item)
 
 def get_transcript(video_id):
+    # Returns {"success": True, "transcript": ...} or {"success": False, "error": ...}
     try:
-        # Try new API style (instantiation)
-        # Check if static method exists
-        if hasattr(YouTubeTranscriptApi, 'get_transcript'):
-             transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-        else:
-             # Fallback to instance method 'fetch' or 'get_transcript'
-             api = YouTubeTranscriptApi()
-             if hasattr(api, 'get_transcript'):
-                 transcript_list = api.get_transcript(video_id)
-             elif hasattr(api, 'fetch'):
-                 transcript_list = api.fetch(video_id)
-             else:
-                 return json.dumps({"success": False, "error": "No suitable method found in YouTubeTranscriptApi"})
+        if _FETCH_NAME is None:
+            return {"success": False, "error": "No suitable method found in YouTubeTranscriptApi"}
+        transcript_list = getattr(_api(), _FETCH_NAME)(video_id)
         
         # Combine text
         full_text = ""
         if transcript_list:
-            parts = []
-            for item in transcript_list:
-                if isinstance(item, dict):
-                    parts.append(item.get('text', ''))
-                elif hasattr(item, 'text'):
-                    parts.append(item.text)
-                else:
-                    parts.append(str(item))
-            full_text = " ".join(parts)
+            full_text = " ".join(_item_text(item) for item in transcript_list)
         
-        return json.dumps({"success": True, "transcript": full_text})
+        return {"success": True, "transcript": full_text}
     except Exception as e:
-        return json.dumps({"success": False, "error": str(e)})
+        return {"success": False, "error": str(e)}
+
+def get_transcripts(video_ids):
+    # Fetch several transcripts concurrently; results keep the order of video_ids
+    async def fetch_many():
+        return await asyncio.gather(*(asyncio.to_thread(get_transcript, vid) for vid in video_ids))
+
+    return asyncio.run(fetch_many())
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print(json.dumps({"success": False, "error": "No video ID provided"}))
+        write_json_line({"success": False, "error": "No video ID provided"})
         sys.exit(1)
         
-    video_id = sys.argv[1]
-    print(get_transcript(video_id))
\ No newline at end of file
+    video_ids = sys.argv[1:]
+    if len(video_ids) == 1:
+        write_json_line(get_transcript(video_ids[0]))
+    else:
+        # one JSON result per line, in argument order
+        for result in get_transcripts(video_ids):
+            write_json_line(result)
\ No newline at end of file
@@ -0,0 +1,20 @@
+import sys
+import json
+
+# orjson is much faster at serializing large transcripts; fall back to the stdlib when it is missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def write_json_line(obj):
+    # Write obj as one line of JSON to stdout and flush it.
+    # orjson produces UTF-8 bytes, which go straight to the binary stream so the console
+    # encoding never matters; the stdlib fallback keeps ensure_ascii escaping for the same reason.
+    if orjson is not None:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(obj) + b"\n")
+        sys.stdout.buffer.flush()
+    else:
+        sys.stdout.write(json.dumps(obj) + "\n")
+        sys.stdout.flush()